@@ -5,10 +5,13 @@
 作者：Akuma
 """
 
+import asyncio
 import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import cached_property
 from typing import List, Dict, Any, Optional
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
@@ -33,6 +36,8 @@ class FileOperationError(SunKeywordException):
 @dataclass
 class KeywordEntry:
     """关键词条目数据类"""
+    __slots__ = ("keyword", "reply")
+    
     keyword: str
     reply: str
     
@@ -63,8 +68,10 @@ class PluginConstants:
     PLUGIN_DESCRIPTION = "SunKeyword 智能词库回复插件"
     PLUGIN_URL = "https://github.com/Akuma-real/sunos-sunkeyword"
     
-    COMMAND_PREFIXES = ["/sunos", ".sunos"]
+    COMMAND_NAME = "sunos"
+    COMMAND_PREFIX_CHARS = frozenset("/.")
     SUBCOMMAND_NAMESPACE = "ck"
+    COMMAND_MAX_SPLIT = 3
     
     EMPTY_KEYWORDS_MESSAGE = "📭 当前没有词库记录"
     KEYWORDS_LIST_HEADER = "📚 当前词库列表:"
@@ -81,10 +88,10 @@ class PluginConstants:
 • 支持 .sunos 前缀，例如：.sunos ck list
 • 关键词匹配不区分大小写"""
     
-    SELF_TRIGGER_INDICATORS = [
+    SELF_TRIGGER_INDICATORS = (
         "📚 当前词库列表", "📭 当前没有词库记录",
         "🌟 SunKeyword 使用指南"
-    ]
+    )
     
     DEFAULT_KEYWORDS_FILENAME = "keywords.json"
     JSON_ENCODING = "utf-8"
@@ -94,17 +101,22 @@ class PluginConstants:
 
 
 class CaseInsensitiveMatchingStrategy:
-    """大小写不敏感匹配策略"""
+    """大小写不敏感匹配策略
+
+    匹配策略只需提供 normalize()，将已去除首尾空白的文本转换为匹配键；
+    关键词与消息的匹配键完全相等即视为命中。normalize() 不得缩短输入，
+    关键词管理器据此跳过长度超过最长匹配键的消息。
+    """
     
-    def matches(self, keyword: str, message: str) -> bool:
-        if not isinstance(keyword, str) or not isinstance(message, str):
-            return False
-        return keyword.strip().casefold() == message.strip().casefold()
+    def normalize(self, text: str) -> str:
+        return text.casefold()
 
 
 class TextProcessor:
     """文本处理工具类"""
     
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+    
     @staticmethod
     def normalize_text(text: str) -> str:
         if not isinstance(text, str):
@@ -116,7 +128,7 @@ class TextProcessor:
             normalized = normalized.replace("\\r", "\r")
             return normalized
         except (AttributeError, TypeError) as e:
-            logger.warning(f"文本规范化失败: {e}")
+            logger.warning("文本规范化失败: %s", e)
             return str(text)
     
     @staticmethod  
@@ -128,7 +140,7 @@ class TextProcessor:
             return ""
         
         normalized = TextProcessor.normalize_text(reply)
-        cleaned = re.sub(r'\s+', ' ', normalized.strip())
+        cleaned = TextProcessor.WHITESPACE_PATTERN.sub(' ', normalized.strip())
         
         if len(cleaned) > max_length:
             return cleaned[:max_length] + "..."
@@ -144,14 +156,15 @@ class TextProcessor:
         
         for index, entry in enumerate(display_keywords, 1):
             preview = TextProcessor.create_reply_preview(entry.reply)
-            lines.append(f"{index:2d}. {entry.keyword} → {preview}")
+            keyword = TextProcessor.normalize_text(entry.keyword)
+            lines.append(f"{index:2d}. {keyword} → {preview}")
         
         total_count = len(keywords)
         if total_count > PluginConstants.MAX_KEYWORDS_DISPLAY:
             lines.append(f"\n... 还有 {total_count - PluginConstants.MAX_KEYWORDS_DISPLAY} 条记录未显示")
         
         lines.append(f"\n📊 共 {total_count} 条记录")
-        return TextProcessor.normalize_text("\n".join(lines))
+        return "\n".join(lines)
 
 
 class InputValidator:
@@ -162,14 +175,12 @@ class InputValidator:
         if not isinstance(text, str):
             return False
         
-        trimmed = text.strip().lower()
-        if not trimmed:
+        text = text.lstrip()
+        if text[:1] not in PluginConstants.COMMAND_PREFIX_CHARS:
             return False
         
-        return any(
-            trimmed.startswith(prefix.lower()) 
-            for prefix in PluginConstants.COMMAND_PREFIXES
-        )
+        command_name = PluginConstants.COMMAND_NAME
+        return text[1:len(command_name) + 1].lower() == command_name
     
     @staticmethod
     def is_self_trigger_message(text: str) -> bool:
@@ -199,7 +210,7 @@ class FileManager:
     
     def load_keywords_from_file(self) -> List[KeywordEntry]:
         if not os.path.exists(self.file_path):
-            logger.info(f"关键词文件不存在，返回空列表: {self.file_path}")
+            logger.info("关键词文件不存在，返回空列表: %s", self.file_path)
             return []
         
         raw_data = self._read_json_file()
@@ -230,18 +241,18 @@ class FileManager:
                 entry = KeywordEntry.from_dict(item_data)
                 keyword_entries.append(entry)
             except DataValidationError as e:
-                logger.warning(f"跳过无效的关键词条目 #{index + 1}: {e}")
+                logger.warning("跳过无效的关键词条目 #%d: %s", index + 1, e)
                 continue
         
-        logger.info(f"成功加载 {len(keyword_entries)} 条关键词")
+        logger.info("成功加载 %d 条关键词", len(keyword_entries))
         return keyword_entries
 
 
 class HelpCommand:
     """帮助命令实现"""
     
-    def execute(self, event: AstrMessageEvent, args: List[str]) -> str:
-        logger.info("执行帮助命令")
+    async def execute(self, event: AstrMessageEvent, args: List[str]) -> str:
+        logger.debug("执行帮助命令")
         return PluginConstants.HELP_DOCUMENTATION
 
 
@@ -250,14 +261,20 @@ class ListCommand:
     
     def __init__(self, keyword_manager):
         self.keyword_manager = keyword_manager
+        self._formatted_source: Optional[List[KeywordEntry]] = None
+        self._formatted_output: str = ""
     
-    def execute(self, event: AstrMessageEvent, args: List[str]) -> str:
+    async def execute(self, event: AstrMessageEvent, args: List[str]) -> str:
         try:
-            logger.info("执行列表命令")
-            keywords = self.keyword_manager.get_all_keywords()
-            return TextProcessor.format_keyword_list(keywords)
+            logger.debug("执行列表命令")
+            await self.keyword_manager.ensure_loaded_async()
+            keywords = self.keyword_manager.get_cached_keywords()
+            if keywords is not self._formatted_source:
+                self._formatted_output = TextProcessor.format_keyword_list(keywords)
+                self._formatted_source = keywords
+            return self._formatted_output
         except Exception as e:
-            logger.error(f"执行列表命令失败: {e}")
+            logger.error("执行列表命令失败: %s", e)
             return "❌ 获取词库列表失败，请稍后重试"
 
 
@@ -279,20 +296,21 @@ class CommandProcessor:
         self.commands["list"] = list_command
         self.commands["ls"] = list_command
     
-    def process_command(self, event: AstrMessageEvent, args: List[str]) -> str:
+    async def process_command(self, event: AstrMessageEvent, args: List[str]) -> str:
         if len(args) < 3:
             return PluginConstants.COMMAND_USAGE_MESSAGE
         
         command_name = args[2].lower()
+        command = self.commands.get(command_name)
         
-        if command_name in self.commands:
-            try:
-                return self.commands[command_name].execute(event, args)
-            except Exception as e:
-                logger.error(f"命令 '{command_name}' 执行失败: {e}")
-                return f"❌ 命令执行失败: {str(e)}"
-        else:
+        if command is None:
             return PluginConstants.UNKNOWN_COMMAND_MESSAGE
+        
+        try:
+            return await command.execute(event, args)
+        except Exception as e:
+            logger.error("命令 '%s' 执行失败: %s", command_name, e)
+            return f"❌ 命令执行失败: {str(e)}"
 
 
 class KeywordManager:
@@ -302,41 +320,103 @@ class KeywordManager:
         self.file_manager = FileManager(file_path)
         self.matching_strategy = matching_strategy or CaseInsensitiveMatchingStrategy()
         self._keywords_cache: Optional[List[KeywordEntry]] = None
+        self._reply_index: Optional[Dict[str, str]] = None
+        self._max_key_length: int = 0
         self._cache_valid: bool = False
+        self._reload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sunkeyword-reload")
+        self._reload_future: Optional[asyncio.Future] = None
+        self._closed: bool = False
         
         logger.info("关键词管理器初始化完成")
     
     def _invalidate_cache(self) -> None:
         self._keywords_cache = None
+        self._reply_index = None
+        self._max_key_length = 0
         self._cache_valid = False
     
     def _is_cache_valid(self) -> bool:
         return self._cache_valid and self._keywords_cache is not None
     
+    def is_empty(self) -> bool:
+        return self._is_cache_valid() and not self._keywords_cache
+    
     def get_all_keywords(self, force_reload: bool = False) -> List[KeywordEntry]:
         if not force_reload and self._is_cache_valid():
             return self._keywords_cache
         
         try:
-            self._keywords_cache = self.file_manager.load_keywords_from_file()
+            keywords = self.file_manager.load_keywords_from_file()
+            reply_index = self._build_reply_index(keywords)
+            if self._closed:
+                return keywords
+            
+            self._max_key_length = max(map(len, reply_index), default=0)
+            self._reply_index = reply_index
+            self._keywords_cache = keywords
             self._cache_valid = True
             return self._keywords_cache
         except (FileOperationError, DataValidationError) as e:
-            logger.error(f"加载关键词失败: {e}")
+            logger.error("加载关键词失败: %s", e)
             return []
+        except Exception as e:
+            logger.error("加载关键词时发生未知错误: %s", e)
+            return []
+    
+    def get_cached_keywords(self) -> List[KeywordEntry]:
+        keywords = self._keywords_cache
+        return keywords if keywords is not None else []
     
-    def find_matching_reply(self, message: str) -> Optional[str]:
-        if not isinstance(message, str) or not message.strip():
+    def _build_reply_index(self, keywords: List[KeywordEntry]) -> Dict[str, str]:
+        reply_index: Dict[str, str] = {}
+        for entry in keywords:
+            reply_index.setdefault(
+                self.matching_strategy.normalize(entry.keyword),
+                TextProcessor.normalize_text(entry.reply),
+            )
+        return reply_index
+    
+    async def find_matching_reply_async(self, message: str) -> Optional[str]:
+        if self._closed:
             return None
         
-        keywords = self.get_all_keywords()
+        await self.ensure_loaded_async()
+        return self._lookup_reply(message)
+    
+    async def ensure_loaded_async(self) -> None:
+        if self._closed:
+            return
         
-        for entry in keywords:
-            if self.matching_strategy.matches(entry.keyword, message):
-                logger.debug(f"关键词匹配成功: '{entry.keyword}' -> '{message}'")
-                return TextProcessor.normalize_text(entry.reply)
+        if not self._is_cache_valid():
+            await self._reload_async()
+    
+    async def _reload_async(self) -> None:
+        if self._reload_future is None or self._reload_future.done():
+            loop = asyncio.get_running_loop()
+            self._reload_future = loop.run_in_executor(self._reload_executor, self.get_all_keywords)
+        await asyncio.shield(self._reload_future)
+    
+    def _lookup_reply(self, message: str) -> Optional[str]:
+        if not isinstance(message, str) or not message:
+            return None
+        
+        reply_index = self._reply_index
+        if reply_index is None:
+            return None
         
-        return None
+        # 规范化只会让文本变长，超过最长关键词的消息不可能命中
+        if len(message) > self._max_key_length:
+            return None
+        
+        reply = reply_index.get(self.matching_strategy.normalize(message))
+        if reply is not None:
+            logger.debug("关键词匹配成功: '%s'", message)
+        return reply
+    
+    def close(self) -> None:
+        self._closed = True
+        self._reload_executor.shutdown(wait=False)
+        self._invalidate_cache()
 
 
 @register(
@@ -363,15 +443,27 @@ class SunKeywordPlugin(Star):
                 self.keywords_file_path,
                 CaseInsensitiveMatchingStrategy()
             )
+            self._warmup_task: Optional[asyncio.Task] = None
+            self._schedule_keyword_warmup()
             
-            self.command_processor = CommandProcessor(self.keyword_manager)
-            
-            logger.info(f"🚀 SunKeyword 插件 v{PluginConstants.PLUGIN_VERSION} 初始化成功")
+            logger.info("🚀 SunKeyword 插件 v%s 初始化成功", PluginConstants.PLUGIN_VERSION)
             
         except Exception as e:
-            logger.error(f"❌ 插件初始化失败: {e}")
+            logger.error("❌ 插件初始化失败: %s", e)
             raise SunKeywordException(f"插件初始化失败: {e}")
     
+    def _schedule_keyword_warmup(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        
+        self._warmup_task = loop.create_task(self.keyword_manager.ensure_loaded_async())
+    
+    @cached_property
+    def command_processor(self) -> CommandProcessor:
+        return CommandProcessor(self.keyword_manager)
+    
     def _parse_command_arguments(self, message: str) -> List[str]:
         if not isinstance(message, str):
             return []
@@ -380,16 +472,18 @@ class SunKeywordPlugin(Star):
         if not cleaned_message:
             return []
         
-        return cleaned_message.split()
+        return cleaned_message.split(maxsplit=PluginConstants.COMMAND_MAX_SPLIT)
     
     @filter.command("sunos")
     async def handle_sunos_slash_command(self, event: AstrMessageEvent):
-        async for result in self._process_sunos_command(event):
+        result = await self._process_sunos_command(event)
+        if result is not None:
             yield result
     
     @filter.command_group("sunos")
     async def handle_sunos_dot_command(self, event: AstrMessageEvent):
-        async for result in self._process_sunos_command(event):
+        result = await self._process_sunos_command(event)
+        if result is not None:
             yield result
     
     async def _process_sunos_command(self, event: AstrMessageEvent):
@@ -397,19 +491,24 @@ class SunKeywordPlugin(Star):
             args = self._parse_command_arguments(event.message_str)
             
             if len(args) < 2:
-                return
+                return None
+            
+            if args[1] != PluginConstants.SUBCOMMAND_NAMESPACE:
+                return None
             
-            if args[1] == PluginConstants.SUBCOMMAND_NAMESPACE:
-                result_message = self.command_processor.process_command(event, args)
-                yield event.plain_result(result_message)
+            result_message = await self.command_processor.process_command(event, args)
+            return event.plain_result(result_message)
             
         except Exception as e:
-            logger.error(f"处理 sunos 命令时发生错误: {e}")
-            yield event.plain_result("❌ 系统错误，请稍后重试")
+            logger.error("处理 sunos 命令时发生错误: %s", e)
+            return event.plain_result("❌ 系统错误，请稍后重试")
     
     @filter.event_message_type(filter.EventMessageType.ALL, priority=1)
     async def handle_auto_reply_messages(self, event: AstrMessageEvent, context: Context = None, *args, **kwargs):
         try:
+            if self.keyword_manager.is_empty():
+                return
+            
             user_message = event.message_str
             if not isinstance(user_message, str):
                 return
@@ -418,31 +517,33 @@ class SunKeywordPlugin(Star):
             if not trimmed_message:
                 return
             
+            reply_content = await self.keyword_manager.find_matching_reply_async(trimmed_message)
+            if not reply_content:
+                return
+            
             if InputValidator.is_command_message(trimmed_message):
                 return
             
             if InputValidator.is_self_trigger_message(trimmed_message):
                 return
             
-            reply_content = self.keyword_manager.find_matching_reply(user_message)
-            if reply_content:
-                logger.debug(f"触发自动回复，消息: '{trimmed_message[:50]}...'")
-                yield event.plain_result(reply_content)
+            logger.debug("触发自动回复，消息: '%.50s...'", trimmed_message)
+            yield event.plain_result(reply_content)
                 
         except Exception as e:
-            logger.error(f"自动回复处理失败: {e}")
+            logger.error("自动回复处理失败: %s", e)
     
     async def terminate(self):
         try:
-            logger.info(f"👋 SunKeyword 插件 v{PluginConstants.PLUGIN_VERSION} 正在卸载...")
+            logger.info("👋 SunKeyword 插件 v%s 正在卸载...", PluginConstants.PLUGIN_VERSION)
             
             if hasattr(self, 'keyword_manager'):
-                self.keyword_manager._invalidate_cache()
+                self.keyword_manager.close()
             
             logger.info("✅ SunKeyword 插件卸载完成")
             
         except Exception as e:
-            logger.error(f"❌ 插件卸载时发生错误: {e}")
+            logger.error("❌ 插件卸载时发生错误: %s", e)
 
 
 if __name__ == "__main__":